@@ -6,101 +6,249 @@
 """
 
 import os
+import binascii
+import functools
+import logging
 import re
-import base64
 import json
+import threading
 import requests
+from urllib3.util.retry import Retry
 import yaml
+
+# 优先使用libyaml的C实现，速度远快于纯Python实现
+try:
+    from yaml import CSafeDumper as YamlDumper
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeDumper as YamlDumper
+    from yaml import SafeLoader as YamlLoader
+
+# VMess的JSON解析优先用orjson（Rust实现），未安装时退回标准库
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
-from urllib.parse import urlparse, parse_qs, unquote
-import time
+from urllib.parse import urlparse, parse_qsl, unquote
 import shutil
+import time
+
+# 重复订阅中同名节点的百分号解码结果缓存
+_cached_unquote = functools.lru_cache(maxsize=4096)(unquote)
+
+# 每行一个节点的解析失败属于热路径诊断，默认不输出，调试时降级到DEBUG查看
+logger = logging.getLogger(__name__)
+
+# 并发抓取配置
+MAX_FETCH_WORKERS = 16
+# 同一主机最多同时2个请求，代替全局sleep限速
+PER_HOST_LIMIT = 2
+
+# 请求头固定不变，构建一次供所有抓取线程复用
+_FETCH_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    'Accept': 'text/plain, */*',
+}
+
+# 全局会话：连接池+keep-alive，同主机多个链接复用TLS连接；
+# 瞬时网络错误重试2次，退避间隔短不拖慢整体抓取
+_session = requests.Session()
+_adapter = requests.adapters.HTTPAdapter(
+    pool_connections=MAX_FETCH_WORKERS, pool_maxsize=MAX_FETCH_WORKERS,
+    max_retries=Retry(total=2, backoff_factor=0.3))
+_session.mount('http://', _adapter)
+_session.mount('https://', _adapter)
+
+_host_semaphores = defaultdict(lambda: threading.Semaphore(PER_HOST_LIMIT))
+_host_semaphores_lock = threading.Lock()
+
+# 同一主机两次请求之间的最小间隔（秒）
+MIN_HOST_INTERVAL = 0.5
+_host_last_fetch = {}
+_host_last_fetch_lock = threading.Lock()
+
+
+def _get_host_semaphore(host):
+    """获取按主机划分的并发信号量"""
+    with _host_semaphores_lock:
+        return _host_semaphores[host]
+
+
+def _throttle_host(host):
+    """令牌桶式限速：同一主机的请求保持最小间隔"""
+    while True:
+        with _host_last_fetch_lock:
+            now = time.monotonic()
+            wait = MIN_HOST_INTERVAL - (now - _host_last_fetch.get(host, 0.0))
+            if wait <= 0:
+                _host_last_fetch[host] = now
+                return
+        time.sleep(wait)
+
+# 东八区时区对象构造一次复用
+_BEIJING_TZ = timezone(timedelta(hours=8))
 
 def get_beijing_time():
     """获取东八区北京时间"""
-    utc_now = datetime.utcnow()
-    beijing_tz = timezone(timedelta(hours=8))
-    beijing_time = utc_now.replace(tzinfo=timezone.utc).astimezone(beijing_tz)
-    return beijing_time.strftime('%Y-%m-%d %H:%M:%S')
+    return datetime.now(_BEIJING_TZ).strftime('%Y-%m-%d %H:%M:%S')
+
+# 删除所有Base64字符（含URL安全变体）后仍有剩余，说明不是Base64
+_BASE64_DELETE_TABLE = str.maketrans(
+    '', '', 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/=-_')
+# 开头嗅探用：额外容忍换行，多行Base64订阅体不被误判
+_BASE64_SNIFF_TABLE = str.maketrans(
+    '', '', 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/=-_\r\n')
+
+# 小字符串解码结果缓存的上限，超过的大块内容直接解码不进缓存
+_DECODE_CACHE_MAX_LEN = 4096
 
 def safe_decode_base64(data):
     """安全解码Base64数据"""
     if not data:
         return None
-    
+
     data = str(data).strip()
+
+    # 先只嗅探开头256字符：明显不是Base64的大段内容（YAML/URI列表）
+    # 在O(256)内被拒绝，不必为它付出整体replace拷贝
+    if data[:256].translate(_BASE64_SNIFF_TABLE):
+        return None
+
     data = data.replace('\n', '').replace('\r', '')
-    
-    missing_padding = len(data) % 4
-    if missing_padding:
-        data += '=' * (4 - missing_padding)
-    
+
+    # 单次C层扫描预判字符集，避免对明显非Base64的内容走解码+异常路径
+    if data.translate(_BASE64_DELETE_TABLE):
+        return None
+
+    # 短字符串（ss认证段、重复出现的链接）走缓存，大订阅体直接解码
+    if len(data) <= _DECODE_CACHE_MAX_LEN:
+        return _decode_base64_cached(data)
+    return _decode_base64(data)
+
+@functools.lru_cache(maxsize=4096)
+def _decode_base64_cached(data):
+    return _decode_base64(data)
+
+# URL安全变体的-_统一映射为+/，标准和URL安全Base64走同一条解码路径
+_URLSAFE_TRANS = bytes.maketrans(b'-_', b'+/')
+
+# 解码核心优先用pybase64（libbase64的SIMD实现），未安装时退回binascii
+try:
+    import pybase64
+
+    def _b64decode(buf):
+        return pybase64.b64decode(buf, validate=False)
+except ImportError:
+    _b64decode = binascii.a2b_base64
+
+def _decode_base64(data):
+    buf = data.encode('ascii', 'ignore').translate(_URLSAFE_TRANS)
+    buf += b'=' * (-len(buf) & 3)
+
     try:
-        return base64.b64decode(data).decode('utf-8', errors='ignore')
-    except:
-        try:
-            return base64.urlsafe_b64decode(data).decode('utf-8', errors='ignore')
-        except:
-            return None
+        return _b64decode(buf).decode('utf-8', errors='ignore')
+    except (binascii.Error, ValueError):
+        return None
 
 def clean_config(config):
-    """清理配置，移除空值和无效字段"""
+    """清理配置，移除空值和无效字段（显式栈迭代，避免逐层递归调用）"""
     if not isinstance(config, dict):
         return config
-    
+
     cleaned = {}
-    for key, value in config.items():
-        if value is None or value == '':
-            continue
-        
-        if isinstance(value, (list, dict)) and len(value) == 0:
-            continue
-        
-        if isinstance(value, dict):
-            cleaned_value = clean_config(value)
-            if cleaned_value:
-                cleaned[key] = cleaned_value
-        elif isinstance(value, list):
-            cleaned_list = [clean_config(item) for item in value if clean_config(item) is not None]
-            if cleaned_list:
-                cleaned[key] = cleaned_list
-        else:
-            cleaned[key] = value
-    
+    stack = deque([(config, cleaned)])
+    # 记录 (父字典, 键, 子字典)，遍历结束后剔除清理后为空的子字典
+    links = []
+    while stack:
+        source, target = stack.pop()
+        for key, value in source.items():
+            if value is None or value == '':
+                continue
+
+            if isinstance(value, dict):
+                if not value:
+                    continue
+                child = {}
+                target[key] = child
+                links.append((target, key, child))
+                stack.append((value, child))
+            elif isinstance(value, list):
+                if not value:
+                    continue
+                items = []
+                for item in value:
+                    if isinstance(item, dict):
+                        child = {}
+                        items.append(child)
+                        stack.append((item, child))
+                    elif item is not None:
+                        items.append(item)
+                if items:
+                    target[key] = items
+            else:
+                target[key] = value
+
+    # 自底向上剔除，保证嵌套字典清空后父级键也被移除
+    for parent, key, child in reversed(links):
+        if not child:
+            del parent[key]
+
     return cleaned
 
-def parse_hysteria2(url):
-    """解析Hysteria2链接"""
-    try:
-        url = url[11:]  # 移除 hysteria2://
-        
+# auth@host[:port][?query][#fragment] 结构一次匹配到位，主机支持[IPv6]
+_PROXY_URI_RE = re.compile(
+    r'^([^@]+)@(?:\[([^\]]+)\]|([^:/?#]+))(?::(\d+))?(?:\?([^#]*))?(?:#(.*))?$')
+
+# host:port 单独匹配（parse_ss用），端口必须是纯数字
+_HOSTPORT_RE = re.compile(r'^(?:\[([^\]]+)\]|([^:]+)):(\d+)$')
+
+def match_proxy_uri(rest):
+    """匹配去掉协议前缀后的 auth@host[:port][?query][#fragment] 链接
+
+    返回 (auth, server, port, name, query_params)，不匹配返回None。
+    """
+    m = _PROXY_URI_RE.match(rest)
+    if not m:
+        return None
+
+    auth, ipv6, host, port_str, query_str, fragment = m.groups()
+    server = ipv6 or host
+    port = int(port_str) if port_str else 443
+    # 无百分号编码的名称直接使用，跳过unquote
+    if not fragment:
         name = ""
-        if '#' in url:
-            url, fragment = url.split('#', 1)
-            name = unquote(fragment)
-        
-        if '@' in url:
-            auth_part, server_part = url.split('@', 1)
-            password = auth_part
-        else:
+    elif '%' in fragment:
+        name = _cached_unquote(fragment)
+    else:
+        name = fragment
+    query_params = parse_query_params(query_str) if query_str else {}
+    return auth, server, port, name, query_params
+
+def parse_query_params(query_str):
+    """解析简单query字符串为单值字典，含百分号编码时回退到parse_qsl"""
+    if '%' in query_str:
+        return dict(parse_qsl(query_str, keep_blank_values=True))
+
+    params = {}
+    for part in query_str.split('&'):
+        if part:
+            key, _, value = part.partition('=')
+            params[key] = value
+    return params
+
+def parse_hysteria2(body):
+    """解析Hysteria2链接（传入已去除协议头的部分）"""
+    try:
+        parts = match_proxy_uri(body)
+        if not parts:
             return None
-        
-        server = ""
-        port = 443
-        query_params = {}
-        
-        if '?' in server_part:
-            server_port_part, query_str = server_part.split('?', 1)
-            query_params = parse_qs(query_str)
-        else:
-            server_port_part = server_part
-        
-        if ':' in server_port_part:
-            server, port_str = server_port_part.split(':', 1)
-            port = int(port_str)
-        else:
-            server = server_port_part
-        
+        password, server, port, name, query_params = parts
+
         config = {
             'name': name if name else f"Hysteria2-{server}:{port}",
             'type': 'hysteria2',
@@ -110,38 +258,36 @@ def parse_hysteria2(url):
         }
         
         if query_params.get('sni'):
-            config['sni'] = query_params['sni'][0]
-        
-        insecure = query_params.get('insecure', ['0'])[0] == '1' or query_params.get('allowInsecure', ['0'])[0] == '1'
+            config['sni'] = query_params['sni']
+
+        insecure = query_params.get('insecure', '0') == '1' or query_params.get('allowInsecure', '0') == '1'
         if insecure:
             config['skip-cert-verify'] = True
-        
+
         if query_params.get('alpn'):
-            config['alpn'] = query_params['alpn'][0].split(',')
+            config['alpn'] = query_params['alpn'].split(',')
         
         return clean_config(config)
         
     except Exception as e:
-        print(f"  Hysteria2解析失败: {e}")
+        logger.debug(f"Hysteria2解析失败: {e}")
         return None
 
-def parse_ss(url):
-    """解析Shadowsocks链接"""
+def parse_ss(body):
+    """解析Shadowsocks链接（传入已去除协议头的部分）"""
     try:
-        url = url[5:]  # 移除 ss://
-        
         name = ""
-        if '#' in url:
-            url, fragment = url.split('#', 1)
-            name = unquote(fragment)
-        
-        decoded = safe_decode_base64(url.split('@')[0] if '@' in url else url)
-        
+        if '#' in body:
+            body, fragment = body.split('#', 1)
+            name = _cached_unquote(fragment)
+
+        decoded = safe_decode_base64(body.split('@')[0] if '@' in body else body)
+
         if decoded and ':' in decoded:
             method, password = decoded.split(':', 1)
         else:
-            if '@' in url:
-                encoded_auth, server_part = url.split('@', 1)
+            if '@' in body:
+                encoded_auth, server_part = body.split('@', 1)
                 decoded_auth = safe_decode_base64(encoded_auth)
                 if decoded_auth and ':' in decoded_auth:
                     method, password = decoded_auth.split(':', 1)
@@ -149,20 +295,20 @@ def parse_ss(url):
                     return None
             else:
                 return None
-        
-        if '@' in url:
-            _, server_part = url.split('@', 1)
+
+        if '@' in body:
+            _, server_part = body.split('@', 1)
         else:
-            server_part = url
+            server_part = body
         
         if '?' in server_part:
             server_part, _ = server_part.split('?', 1)
         
-        if ':' in server_part:
-            server, port = server_part.split(':', 1)
-            port = int(port)
-        else:
+        m = _HOSTPORT_RE.match(server_part)
+        if not m:
             return None
+        server = m.group(1) or m.group(2)
+        port = int(m.group(3))
         
         config = {
             'name': name if name else f"SS-{server}:{port}",
@@ -177,139 +323,96 @@ def parse_ss(url):
         return clean_config(config)
         
     except Exception as e:
-        print(f"  SS解析失败: {e}")
+        logger.debug(f"SS解析失败: {e}")
         return None
 
-def parse_vmess(url):
-    """解析VMess链接"""
+def parse_vmess(body):
+    """解析VMess链接（传入已去除协议头的部分）"""
     try:
-        encoded = url[8:]  # 移除 vmess://
-        decoded = safe_decode_base64(encoded)
+        decoded = safe_decode_base64(body)
         
         if not decoded:
             return None
         
-        vmess_config = json.loads(decoded)
-        
+        vmess_config = _json_loads(decoded)
+
+        # 绑定局部get，剩余字段访问少一次属性查找；多次用到的字段只查一次字典
+        get = vmess_config.get
+        add = get('add', '')
+        host = get('host')
+        path = get('path')
+        network = get('net', 'tcp')
+
         config = {
-            'name': vmess_config.get('ps', f"VMess-{vmess_config.get('add', 'unknown')}"),
+            'name': get('ps', f"VMess-{add or 'unknown'}"),
             'type': 'vmess',
-            'server': vmess_config.get('add', ''),
-            'port': int(vmess_config.get('port', 443)),
-            'uuid': vmess_config.get('id', ''),
-            'alterId': int(vmess_config.get('aid', 0)),
-            'cipher': vmess_config.get('scy', 'auto'),
+            'server': add,
+            'port': int(get('port', 443)),
+            'uuid': get('id', ''),
+            'alterId': int(get('aid', 0)),
+            'cipher': get('scy', 'auto'),
             'udp': True,
         }
-        
-        if vmess_config.get('tls') == 'tls':
+
+        if get('tls') == 'tls':
             config['tls'] = True
-            config['skip-cert-verify'] = vmess_config.get('allowInsecure') in [True, 'true', '1']
-        
-        sni = vmess_config.get('sni') or vmess_config.get('host')
+            config['skip-cert-verify'] = get('allowInsecure') in [True, 'true', '1']
+
+        sni = get('sni') or host
         if sni:
             config['servername'] = sni
-        
-        network = vmess_config.get('net', 'tcp')
+
         if network != 'tcp':
             config['network'] = network
-            
+
             if network == 'ws':
                 ws_opts = {}
-                if vmess_config.get('path'):
-                    ws_opts['path'] = vmess_config['path']
-                if vmess_config.get('host'):
-                    ws_opts['headers'] = {'Host': vmess_config['host']}
+                if path:
+                    ws_opts['path'] = path
+                if host:
+                    ws_opts['headers'] = {'Host': host}
                 if ws_opts:
                     config['ws-opts'] = ws_opts
-        
+
         return clean_config(config)
         
     except Exception as e:
-        print(f"  VMess解析失败: {e}")
+        logger.debug(f"VMess解析失败: {e}")
         return None
 
-def parse_trojan(url):
-    """解析Trojan链接"""
+def parse_trojan(body):
+    """解析Trojan链接（传入已去除协议头的部分）"""
     try:
-        url = url[9:]  # 移除 trojan://
-        
-        name = ""
-        if '#' in url:
-            url, fragment = url.split('#', 1)
-            name = unquote(fragment)
-        
-        if '@' in url:
-            password_part, server_part = url.split('@', 1)
-            password = password_part
-        else:
+        parts = match_proxy_uri(body)
+        if not parts:
             return None
-        
-        server = ""
-        port = 443
-        query_params = {}
-        
-        if '?' in server_part:
-            server_port_part, query_str = server_part.split('?', 1)
-            query_params = parse_qs(query_str)
-        else:
-            server_port_part = server_part
-        
-        if ':' in server_port_part:
-            server, port_str = server_port_part.split(':', 1)
-            port = int(port_str)
-        else:
-            server = server_port_part
-        
+        password, server, port, name, query_params = parts
+
         config = {
             'name': name if name else f"Trojan-{server}:{port}",
             'type': 'trojan',
             'server': server,
             'port': port,
             'password': password,
-            'sni': query_params.get('sni', [''])[0] or server,
-            'skip-cert-verify': query_params.get('allowInsecure', ['0'])[0] == '1',
+            'sni': query_params.get('sni', '') or server,
+            'skip-cert-verify': query_params.get('allowInsecure', '0') == '1',
             'udp': True
         }
         
         return clean_config(config)
         
     except Exception as e:
-        print(f"  Trojan解析失败: {e}")
+        logger.debug(f"Trojan解析失败: {e}")
         return None
 
-def parse_vless(url):
-    """解析VLESS链接"""
+def parse_vless(body):
+    """解析VLESS链接（传入已去除协议头的部分）"""
     try:
-        url = url[8:]  # 移除 vless://
-        
-        name = ""
-        if '#' in url:
-            url, fragment = url.split('#', 1)
-            name = unquote(fragment)
-        
-        if '@' in url:
-            uuid_part, server_part = url.split('@', 1)
-            uuid = uuid_part
-        else:
+        parts = match_proxy_uri(body)
+        if not parts:
             return None
-        
-        server = ""
-        port = 443
-        query_params = {}
-        
-        if '?' in server_part:
-            server_port_part, query_str = server_part.split('?', 1)
-            query_params = parse_qs(query_str)
-        else:
-            server_port_part = server_part
-        
-        if ':' in server_port_part:
-            server, port_str = server_port_part.split(':', 1)
-            port = int(port_str)
-        else:
-            server = server_port_part
-        
+        uuid, server, port, name, query_params = parts
+
         config = {
             'name': name if name else f"VLESS-{server}:{port}",
             'type': 'vless',
@@ -319,57 +422,68 @@ def parse_vless(url):
             'udp': True,
         }
         
-        security = query_params.get('security', [''])[0]
+        security = query_params.get('security', '')
         if security in ['tls', 'xtls']:
             config['tls'] = True
-            config['skip-cert-verify'] = query_params.get('allowInsecure', ['0'])[0] == '1'
-        
-        sni = query_params.get('sni', [''])[0] or server
+            config['skip-cert-verify'] = query_params.get('allowInsecure', '0') == '1'
+
+        sni = query_params.get('sni', '') or server
         config['servername'] = sni
         
         return clean_config(config)
         
     except Exception as e:
-        print(f"  VLESS解析失败: {e}")
+        logger.debug(f"VLESS解析失败: {e}")
         return None
 
+# 协议名到解析函数的分发表，partition切出scheme后一次字典查找完成分发
+_PROXY_PARSERS = {
+    'hysteria2': parse_hysteria2,
+    'ss': parse_ss,
+    'vmess': parse_vmess,
+    'trojan': parse_trojan,
+    'vless': parse_vless,
+}
+# 完整前缀元组供startswith预筛，在C层一次完成所有前缀判断
+_PROXY_SCHEMES = tuple(scheme + '://' for scheme in _PROXY_PARSERS)
+
+# 各协议头的Base64编码形式：行首命中即可断定是嵌套的节点列表，直接解码
+_BASE64_PROXY_PREFIXES = ('aHlzdGVyaWEy', 'c3M6', 'dm1lc3M6', 'dHJvamFu', 'dmxlc3M6')
+
 def parse_proxy_url(url):
     """解析代理URL"""
     if not url or not isinstance(url, str):
         return None
-    
+
     url = url.strip()
-    
-    if url.startswith('hysteria2://'):
-        return parse_hysteria2(url)
-    elif url.startswith('ss://'):
-        return parse_ss(url)
-    elif url.startswith('vmess://'):
-        return parse_vmess(url)
-    elif url.startswith('trojan://'):
-        return parse_trojan(url)
-    elif url.startswith('vless://'):
-        return parse_vless(url)
-    
-    return None
+
+    if not url.startswith(_PROXY_SCHEMES):
+        return None
+
+    return _parse_proxy_url_cached(url)
+
+# 同一节点常被多个订阅重复发布，按原始链接缓存解析结果；
+# 下游只读不改解析出的字典，共享同一对象是安全的
+@functools.lru_cache(maxsize=8192)
+def _parse_proxy_url_cached(url):
+    scheme, _, body = url.partition('://')
+    return _PROXY_PARSERS[scheme](body)
 
 def fetch_subscription(url, timeout=30):
     """获取订阅内容 - 修复返回值问题"""
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-        'Accept': 'text/plain, */*',
-    }
-    
     try:
-        response = requests.get(url, headers=headers, timeout=timeout)
-        response.raise_for_status()
-        
-        content = response.text.strip()
+        # 流式按行下载，边传输边组装，避免response.text的整体解码拷贝
+        with _session.get(url, headers=_FETCH_HEADERS, timeout=timeout, stream=True) as response:
+            response.raise_for_status()
+            lines = [raw.decode('utf-8', errors='ignore')
+                     for raw in response.iter_lines() if raw]
+
+        content = '\n'.join(lines).strip()
         decoded = safe_decode_base64(content)
-        
+
         if decoded:
             return decoded, True, None  # 返回三个值
-        
+
         return content, True, None  # 返回三个值
         
     except requests.exceptions.Timeout:
@@ -381,25 +495,149 @@ def fetch_subscription(url, timeout=30):
     except Exception as e:
         return None, False, f"未知错误: {str(e)}"
 
+# 同一次运行中相同链接（多个输入文件引用时）只抓取一次
+_fetch_cache = {}
+_fetch_cache_lock = threading.Lock()
+
+def fetch_all_subscriptions(urls, timeout=15):
+    """并发获取所有订阅内容，按主机限速，返回与urls同序的结果列表"""
+
+    def fetch_one(url):
+        with _fetch_cache_lock:
+            if url in _fetch_cache:
+                return _fetch_cache[url]
+
+        host = urlparse(url).netloc
+        with _get_host_semaphore(host):
+            _throttle_host(host)
+            result = fetch_subscription(url, timeout=timeout)
+
+        with _fetch_cache_lock:
+            _fetch_cache[url] = result
+        return result
+
+    # 生成器输入无法预知数量，直接用满配工作线程
+    if isinstance(urls, (list, tuple)):
+        if not urls:
+            return []
+        workers = min(MAX_FETCH_WORKERS, len(urls))
+    else:
+        workers = MAX_FETCH_WORKERS
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(fetch_one, urls))
+
+def parse_yaml_proxies(content):
+    """从Clash格式的YAML订阅中提取节点"""
+    try:
+        data = yaml.load(content, Loader=YamlLoader)
+    except Exception as e:
+        logger.debug(f"YAML订阅解析失败: {e}")
+        return []
+
+    if not isinstance(data, dict):
+        return []
+
+    yaml_proxies = data.get('proxies') or data.get('Proxy') or []
+    if not isinstance(yaml_proxies, list):
+        return []
+
+    return [clean_config(p) for p in yaml_proxies
+            if isinstance(p, dict) and p.get('server') and p.get('type')]
+
 def process_subscription_content(content):
     """处理订阅内容"""
     if not content:
         return []
-    
+
+    # 只嗅探开头256字符，命中才付出完整YAML解析的代价
+    head = content[:256]
+    if 'proxies:' in head or 'Proxy:' in head:
+        yaml_proxies = parse_yaml_proxies(content)
+        if yaml_proxies:
+            return yaml_proxies
+
     proxies = []
-    lines = content.split('\n')
-    
-    for line in lines:
-        line = line.strip()
-        if not line or line.startswith('#'):
-            continue
-        
-        proxy = parse_proxy_url(line)
-        if proxy:
-            proxies.append(proxy)
-    
+    proxies_append = proxies.append
+    # 迭代工作队列展开嵌套Base64块，避免递归调用
+    work = deque([content])
+
+    while work:
+        block = work.popleft()
+
+        # 生成器表达式流式过滤，不为过滤结果再建一份列表；splitlines正确处理\r\n
+        lines = (stripped for raw in block.splitlines()
+                 if (stripped := raw.strip()) and not stripped.startswith('#'))
+
+        for line in lines:
+            proxy = parse_proxy_url(line)
+            if proxy:
+                proxies_append(proxy)
+                continue
+
+            # 单行可能本身又是Base64编码的订阅块；
+            # 行首就是某个协议头的Base64形式时跳过字符集嗅探直接解码
+            if not line.startswith(_PROXY_SCHEMES):
+                if line.startswith(_BASE64_PROXY_PREFIXES):
+                    decoded = _decode_base64(line)
+                else:
+                    decoded = safe_decode_base64(line)
+                if decoded:
+                    work.append(decoded)
+
     return proxies
 
+# 配置中与节点无关的静态部分在导入时构建一次，生成时浅拷贝复用
+_BASE_CONFIG = {
+    'port': 7890,
+    'socks-port': 7891,
+    'mixed-port': 7893,
+    'allow-lan': False,
+    'mode': 'rule',
+    'log-level': 'info',
+    'external-controller': '127.0.0.1:9090',
+
+    'dns': {
+        'enable': True,
+        'ipv6': False,
+        'listen': '127.0.0.1:53',
+        'default-nameserver': ['223.5.5.5', '119.29.29.29'],
+        'enhanced-mode': 'fake-ip',
+        'fake-ip-range': '198.18.0.1/16',
+        'nameserver': ['https://doh.pub/dns-query'],
+        'fallback': ['https://dns.cloudflare.com/dns-query'],
+        'fallback-filter': {
+            'geoip': True,
+            'ipcidr': ['240.0.0.0/4']
+        }
+    },
+}
+
+_RULES = [
+    # 国内域名直连
+    'DOMAIN-SUFFIX,cn,DIRECT',
+    'DOMAIN-SUFFIX,baidu.com,DIRECT',
+    'DOMAIN-SUFFIX,qq.com,DIRECT',
+    'DOMAIN-SUFFIX,taobao.com,DIRECT',
+    'DOMAIN-SUFFIX,jd.com,DIRECT',
+    'DOMAIN-SUFFIX,weibo.com,DIRECT',
+    'DOMAIN-SUFFIX,sina.com,DIRECT',
+    'DOMAIN-SUFFIX,163.com,DIRECT',
+    'DOMAIN-SUFFIX,alibaba.com,DIRECT',
+    'DOMAIN-SUFFIX,alicdn.com,DIRECT',
+    'DOMAIN-SUFFIX,alipay.com,DIRECT',
+    'DOMAIN-SUFFIX,tencent.com,DIRECT',
+    'DOMAIN-SUFFIX,bilibili.com,DIRECT',
+    'DOMAIN-SUFFIX,zhihu.com,DIRECT',
+    'DOMAIN-SUFFIX,douyin.com,DIRECT',
+
+    # GEOIP中国直连
+    'GEOIP,CN,DIRECT',
+
+    # 最终规则
+    'MATCH,节点选择'
+]
+
 def generate_clash_config_with_comments(proxies, filename, source_content, success_count, total_count, failed_urls):
     """生成带备注的Clash配置"""
     
@@ -438,77 +676,33 @@ def generate_clash_config_with_comments(proxies, filename, source_content, succe
             'udp': True
         }]
     
-    cleaned_proxies = [clean_config(p) for p in proxies if p]
-    
-    # Clash配置
-    config = {
-        'port': 7890,
-        'socks-port': 7891,
-        'mixed-port': 7893,
-        'allow-lan': False,
-        'mode': 'rule',
-        'log-level': 'info',
-        'external-controller': '127.0.0.1:9090',
-        
-        'dns': {
-            'enable': True,
-            'ipv6': False,
-            'listen': '127.0.0.1:53',
-            'default-nameserver': ['223.5.5.5', '119.29.29.29'],
-            'enhanced-mode': 'fake-ip',
-            'fake-ip-range': '198.18.0.1/16',
-            'nameserver': ['https://doh.pub/dns-query'],
-            'fallback': ['https://dns.cloudflare.com/dns-query'],
-            'fallback-filter': {
-                'geoip': True,
-                'ipcidr': ['240.0.0.0/4']
-            }
+    # 各parse_*返回前已做过clean_config，这里无需再逐个清理
+    cleaned_proxies = [p for p in proxies if p]
+
+    # 截断和名称列表只计算一次，供proxies和proxy-groups共用
+    top_proxies = cleaned_proxies[:200]
+    proxy_names = [p.get('name', '节点') for p in top_proxies]
+
+    # Clash配置：静态部分浅拷贝模板，只拼装与节点相关的键
+    config = dict(_BASE_CONFIG)
+    config['proxies'] = top_proxies
+    config['proxy-groups'] = [
+        {
+            'name': '节点选择',
+            'type': 'select',
+            'proxies': ['自动选择', 'DIRECT']
         },
-        
-        'proxies': cleaned_proxies[:200],
-        
-        'proxy-groups': [
-            {
-                'name': '节点选择',
-                'type': 'select',
-                'proxies': ['自动选择', 'DIRECT']
-            },
-            {
-                'name': '自动选择',
-                'type': 'url-test',
-                'url': 'http://www.gstatic.com/generate_204',
-                'interval': 300,
-                'tolerance': 50,
-                'proxies': [p.get('name', '节点') for p in cleaned_proxies[:200]]
-            }
-        ],
-        
-        'rules': [
-            # 国内域名直连
-            'DOMAIN-SUFFIX,cn,DIRECT',
-            'DOMAIN-SUFFIX,baidu.com,DIRECT',
-            'DOMAIN-SUFFIX,qq.com,DIRECT',
-            'DOMAIN-SUFFIX,taobao.com,DIRECT',
-            'DOMAIN-SUFFIX,jd.com,DIRECT',
-            'DOMAIN-SUFFIX,weibo.com,DIRECT',
-            'DOMAIN-SUFFIX,sina.com,DIRECT',
-            'DOMAIN-SUFFIX,163.com,DIRECT',
-            'DOMAIN-SUFFIX,alibaba.com,DIRECT',
-            'DOMAIN-SUFFIX,alicdn.com,DIRECT',
-            'DOMAIN-SUFFIX,alipay.com,DIRECT',
-            'DOMAIN-SUFFIX,tencent.com,DIRECT',
-            'DOMAIN-SUFFIX,bilibili.com,DIRECT',
-            'DOMAIN-SUFFIX,zhihu.com,DIRECT',
-            'DOMAIN-SUFFIX,douyin.com,DIRECT',
-            
-            # GEOIP中国直连
-            'GEOIP,CN,DIRECT',
-            
-            # 最终规则
-            'MATCH,节点选择'
-        ]
-    }
-    
+        {
+            'name': '自动选择',
+            'type': 'url-test',
+            'url': 'http://www.gstatic.com/generate_204',
+            'interval': 300,
+            'tolerance': 50,
+            'proxies': proxy_names
+        }
+    ]
+    config['rules'] = _RULES
+
     config = clean_config(config)
     
     # 写入文件
@@ -517,20 +711,25 @@ def generate_clash_config_with_comments(proxies, filename, source_content, succe
     
     output_path = os.path.join(output_dir, f'{filename}.yaml')
     
-    with open(output_path, 'w', encoding='utf-8') as f:
-        # 写入备注
-        f.write(comments)
-        # 写入配置
-        yaml.dump(config, f, 
-                 allow_unicode=True, 
-                 default_flow_style=False, 
-                 sort_keys=False,
-                 width=float("inf"))
+    # 先在内存中序列化成完整文本，再一次性写入临时文件并原子替换，
+    # 避免PyYAML对文件对象的大量小块写入，也避免崩溃时留下半截文件
+    config_text = yaml.dump(config,
+                            Dumper=YamlDumper,
+                            allow_unicode=True,
+                            default_flow_style=False,
+                            sort_keys=False,
+                            width=4096)
+
+    tmp_path = output_path + '.tmp'
+    # 二进制模式一次写入预编码内容，绕过文本层的逐块编码
+    with open(tmp_path, 'wb') as f:
+        f.write((comments + config_text).encode('utf-8'))
+    os.replace(tmp_path, output_path)
     
     print(f"  生成配置文件: {output_path}")
-    print(f"  包含 {len(cleaned_proxies[:200])} 个节点")
-    
-    return len(cleaned_proxies[:200])
+    print(f"  包含 {len(top_proxies)} 个节点")
+
+    return len(top_proxies)
 
 def clear_output_directory():
     """清空输出目录"""
@@ -539,16 +738,16 @@ def clear_output_directory():
     if os.path.exists(output_dir):
         print(f"清空输出目录: {output_dir}")
         try:
-            # 只删除文件，保留目录
-            for filename in os.listdir(output_dir):
-                file_path = os.path.join(output_dir, filename)
-                try:
-                    if os.path.isfile(file_path) or os.path.islink(file_path):
-                        os.unlink(file_path)
-                    elif os.path.isdir(file_path):
-                        shutil.rmtree(file_path)
-                except Exception as e:
-                    print(f"删除文件 {file_path} 失败: {e}")
+            # 只删除文件，保留目录；DirEntry自带类型信息，无需逐个stat
+            with os.scandir(output_dir) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_file(follow_symlinks=False) or entry.is_symlink():
+                            os.unlink(entry.path)
+                        elif entry.is_dir(follow_symlinks=False):
+                            shutil.rmtree(entry.path)
+                    except Exception as e:
+                        print(f"删除文件 {entry.path} 失败: {e}")
             print("输出目录已清空")
         except Exception as e:
             print(f"清空目录失败: {e}")
@@ -556,28 +755,34 @@ def clear_output_directory():
         os.makedirs(output_dir, exist_ok=True)
         print("创建输出目录")
 
+def iter_links_from_file(filepath):
+    """逐行产出文件中的订阅链接，跳过空行和注释"""
+    with open(filepath, 'r', encoding='utf-8', buffering=1 << 16) as f:
+        for line in f:
+            stripped = line.strip()
+            if stripped and not stripped.startswith('#'):
+                yield stripped
+
 def read_source_file_content(filepath):
     """读取源文件内容并添加#注释"""
     try:
+        # 逐行流式加注释，不先readlines()把整个文件复制一份到内存
         with open(filepath, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-        
-        commented_lines = []
-        for line in lines:
-            line = line.rstrip('\n')
-            if line.strip():
-                commented_lines.append(f"# {line}")
-            else:
-                commented_lines.append("#")
-        
-        return "\n".join(commented_lines)
-        
+            return "\n".join(
+                f"# {stripped}" if (stripped := line.rstrip('\n')).strip() else "#"
+                for line in f)
+
     except Exception as e:
         print(f"读取源文件失败: {e}")
         return "# 无法读取源文件内容"
 
 def main():
     """主函数"""
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    if not getattr(yaml, '__with_libyaml__', False):
+        print("提示: 当前PyYAML未带libyaml，YAML输出走纯Python实现（较慢）")
+
     print("=" * 70)
     print("自动订阅生成器 - 增强版")
     print("=" * 70)
@@ -589,8 +794,10 @@ def main():
     input_dir = '输入源'
     os.makedirs(input_dir, exist_ok=True)
     
-    # 查找输入文件
-    txt_files = [f for f in os.listdir(input_dir) if f.endswith('.txt')]
+    # 查找输入文件，scandir复用readdir带回的类型信息，省去逐个stat
+    with os.scandir(input_dir) as entries:
+        txt_files = [entry.name for entry in entries
+                     if entry.is_file() and entry.name.endswith('.txt')]
     
     if not txt_files:
         print(f"\n没有找到输入文件，请在 '{input_dir}' 中创建.txt文件")
@@ -605,6 +812,25 @@ https://vyy.cqsvhb.cn/s/c59454c04c7395f58b5d8165a598ad64
         print(f"已创建示例文件: {input_dir}/example.txt")
         txt_files = ['example.txt']
     
+    # 预取：先把所有文件的订阅链接一次性并发拉取，
+    # 后续按文件处理时直接命中本次运行的抓取缓存
+    if len(txt_files) > 1:
+        def iter_all_urls():
+            # 边读文件边产出链接，文件读取与网络派发重叠
+            seen_urls = set()
+            for filename in txt_files:
+                try:
+                    for link in iter_links_from_file(os.path.join(input_dir, filename)):
+                        if link not in seen_urls:
+                            seen_urls.add(link)
+                            yield link
+                except Exception as e:
+                    print(f"预读 {filename} 失败: {e}")
+
+        print(f"\n预取 {len(txt_files)} 个文件的订阅链接...")
+        results = fetch_all_subscriptions(iter_all_urls(), timeout=15)
+        print(f"预取完成: {len(results)} 个链接")
+
     # 处理每个文件
     for filename in txt_files:
         print(f"\n" + "=" * 50)
@@ -617,8 +843,7 @@ https://vyy.cqsvhb.cn/s/c59454c04c7395f58b5d8165a598ad64
         source_content = read_source_file_content(filepath)
         
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                urls = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+            urls = list(iter_links_from_file(filepath))
         except Exception as e:
             print(f"  读取失败: {e}")
             continue
@@ -631,22 +856,32 @@ https://vyy.cqsvhb.cn/s/c59454c04c7395f58b5d8165a598ad64
         print(f"  找到 {total_count} 个订阅链接")
         
         all_proxies = []
+        seen_keys = set()
+        raw_proxy_count = 0
         failed_urls = []
         success_count = 0
         
-        # 处理每个链接
-        for i, url in enumerate(urls):
+        # 并发获取所有链接
+        print(f"\n  并发获取 {total_count} 个链接...")
+        results = fetch_all_subscriptions(urls, timeout=15)
+
+        for i, (url, result) in enumerate(zip(urls, results)):
             print(f"\n  [{i+1}/{total_count}] 处理链接")
             print(f"    链接: {url[:80]}...")
-            
-            # 修复：正确处理三个返回值
-            result = fetch_subscription(url, timeout=15)
+
             content, success, error_msg = result
-            
+
             if success and content:
                 proxies = process_subscription_content(content)
                 if proxies:
-                    all_proxies.extend(proxies)
+                    # 边收集边去重，重复节点不进入总列表
+                    raw_proxy_count += len(proxies)
+                    for proxy in proxies:
+                        # 元组键直接哈希，省去f-string拼接
+                        key = (proxy.get('type'), proxy.get('server'), proxy.get('port'))
+                        if key not in seen_keys:
+                            seen_keys.add(key)
+                            all_proxies.append(proxy)
                     success_count += 1
                     print(f"    ✅ 成功获取，找到 {len(proxies)} 个节点")
                 else:
@@ -656,34 +891,20 @@ https://vyy.cqsvhb.cn/s/c59454c04c7395f58b5d8165a598ad64
                 error_info = error_msg if error_msg else "未知错误"
                 print(f"    ❌ 失败: {error_info}")
                 failed_urls.append(f"# {url} - {error_info}")
-            
-            # 避免请求过快
-            if i < total_count - 1:
-                time.sleep(1)
         
         # 生成失败链接备注
         failed_comments = "\n".join(failed_urls) if failed_urls else "# 无失败链接"
-        
-        # 去重
-        unique_proxies = []
-        seen = set()
-        
-        for proxy in all_proxies:
-            if not proxy:
-                continue
-            
-            key = f"{proxy.get('server', '')}:{proxy.get('port', '')}:{proxy.get('type', '')}"
-            if key not in seen:
-                seen.add(key)
-                unique_proxies.append(proxy)
-        
+
+        # 去重已在收集时完成
+        unique_proxies = all_proxies
+
         # 统计信息
         print(f"\n  {'='*30}")
         print(f"  处理完成统计:")
         print(f"    总链接数: {total_count}")
         print(f"    成功获取: {success_count}")
         print(f"    失败链接: {total_count - success_count}")
-        print(f"    原始节点: {len(all_proxies)} 个")
+        print(f"    原始节点: {raw_proxy_count} 个")
         print(f"    去重节点: {len(unique_proxies)} 个")
         
         # 按类型统计